@@ -1,75 +1,173 @@
-import cv2
-import mediapipe as mp
-import time
-
-
-class FaceMeshDetector():
-    """
-    Detects facial landmarks using MediaPipe's Face Mesh.
-
-    Args:
-        staticMode (bool): If True, treats input images as static.
-        maxFaces (int): Max number of faces to detect.
-        refine_landmarks (bool): Whether to refine landmark locations.
-        minDetectionCon (float): Minimum confidence for initial detection.
-        minTrackCon (float): Minimum confidence for tracking landmarks.
-    """
-
-    def __init__(self, staticMode=False, maxFaces=2, refine_landmarks=False, minDetectionCon=0.5, minTrackCon=0.5):
-
-        self.staticMode = staticMode
-        self.maxFaces = maxFaces
-        self.refine_landmarks = refine_landmarks
-        self.minDetectionCon = minDetectionCon
-        self.minTrackCon = minTrackCon
-        self.mpDraw = mp.solutions.drawing_utils
-        self.mpFaceMesh = mp.solutions.face_mesh
-        self.faceMesh = self.mpFaceMesh.FaceMesh(self.staticMode, self.maxFaces, self.refine_landmarks, self.minDetectionCon, self.minTrackCon)
-        self.drawSpec = self.mpDraw.DrawingSpec(thickness=1, circle_radius=2)
-
-    def findFaceMesh(self, img, draw=True):
-        """
-        Finds face meshes in the input image.
-
-        Args:
-            img (ndarray): Input BGR image.
-            draw (bool): Whether to draw mesh on image.
-
-        Returns:
-            img (ndarray): Image with or without drawings.
-            faces (list): List of faces with landmark coordinates.
-        """
-        self.imgRGB = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        self.results = self.faceMesh.process(self.imgRGB)
-        faces = []
-        if self.results.multi_face_landmarks:
-
-            for faceLms in self.results.multi_face_landmarks:
-                if draw:
-                    self.mpDraw.draw_landmarks(img, faceLms, self.mpFaceMesh.FACEMESH_CONTOURS, self.drawSpec, self.drawSpec)
-                    face = []
-                    for id,lm in enumerate(faceLms.landmark):
-                        ih, iw, ic = img.shape
-                        x,y = int(lm.x*iw), int(lm.y*ih)
-                        face.append([x,y])
-                        faces.append(face)
-        return img, faces
-
-def main():
-    cap = cv2.VideoCapture(0)
-    pTime = 0
-    detector = FaceMeshDetector(maxFaces=2)
-    while True:
-        success, img = cap.read()
-        img, faces = detector.findFaceMesh(img)
-        #if len(faces)!= 0:
-            #print(faces[0])
-        cTime = time.time()
-        fps = 1 / (cTime - pTime)
-        pTime = cTime
-        cv2.putText(img, f'FPS: {int(fps)}', (20, 70), cv2.FONT_HERSHEY_PLAIN, 3, (0, 255, 0), 3)
-        cv2.imshow('Image', img)
-        cv2.waitKey(1)
-
-if __name__ == "__main__":
-    main()
+import functools
+
+import cv2
+import mediapipe as mp
+import numpy as np
+
+import kernels
+import pipeline
+import tasks_backend
+
+
+class FaceMeshDetector():
+    """
+    Detects facial landmarks using MediaPipe's Face Mesh.
+
+    Args:
+        staticMode (bool): If True, treats input images as static.
+        maxFaces (int): Max number of faces to detect.
+        refine_landmarks (bool): Whether to refine landmark locations.
+        minDetectionCon (float): Minimum confidence for initial detection.
+        minTrackCon (float): Minimum confidence for tracking landmarks.
+        modelPath (str): Optional path to a face_landmarker .task asset.
+            When given, inference runs through the Tasks API with the GPU
+            delegate (CPU delegate as fallback) instead of mp.solutions.
+        liveStream (bool): With modelPath, use LIVE_STREAM mode: frames are
+            dispatched asynchronously and findFaceMesh annotates with the
+            most recent completed result instead of blocking on inference.
+            resultTimestampMs holds the frame timestamp that result was
+            computed for, so callers can tell how stale it is.
+        procWidth (int): Optional width to downscale frames to before
+            inference. Landmarks are normalized, so coordinates still map
+            back to the full-resolution frame for free.
+        inputIsRgb (bool): Set when frames already arrive in RGB order
+            (e.g. from pipeline.ffmpegRgbFrames); skips the per-frame
+            channel conversion entirely.
+    """
+
+    def __init__(self, staticMode=False, maxFaces=2, refine_landmarks=False, minDetectionCon=0.5, minTrackCon=0.5, modelPath=None, liveStream=False, procWidth=None, inputIsRgb=False):
+
+        self.staticMode = staticMode
+        self.maxFaces = maxFaces
+        self.refine_landmarks = refine_landmarks
+        self.minDetectionCon = minDetectionCon
+        self.minTrackCon = minTrackCon
+        self.procWidth = procWidth
+        self.inputIsRgb = inputIsRgb
+        self.mpDraw = mp.solutions.drawing_utils
+        self.mpFaceMesh = mp.solutions.face_mesh
+        self.landmarker = None
+        self.liveStream = liveStream
+        self._latest = None
+        self._ts = tasks_backend.TimestampGen()
+        self.resultTimestampMs = None
+        if modelPath is not None and tasks_backend.HAS_TASKS:
+            self.landmarker = tasks_backend.createLandmarker(
+                'face', modelPath, num_faces=self.maxFaces,
+                runningMode='live_stream' if liveStream else 'video',
+                resultCallback=self._onResult if liveStream else None)
+        if self.landmarker is None:
+            self.faceMesh = self.mpFaceMesh.FaceMesh(self.staticMode, self.maxFaces, self.refine_landmarks, self.minDetectionCon, self.minTrackCon)
+        self.drawSpec = self.mpDraw.DrawingSpec(thickness=1, circle_radius=2)
+        self._prep = pipeline.FramePrep(procWidth, inputIsRgb)
+        self._contours = np.array(list(self.mpFaceMesh.FACEMESH_CONTOURS),
+                                  dtype=np.int32)
+
+    def _onResult(self, result, output_image, timestamp_ms):
+        """LIVE_STREAM callback: stores the result with its frame timestamp."""
+        self._latest = (result, timestamp_ms)
+
+    def findFaceMeshArray(self, img, draw=True):
+        """
+        Finds face meshes, returning landmark coordinates as NumPy arrays.
+
+        Skips the 468 per-landmark list allocations of findFaceMesh per face
+        and keeps each face's coordinates contiguous for downstream math.
+
+        Args:
+            img (ndarray): Input BGR image.
+            draw (bool): Whether to draw mesh on image.
+
+        Returns:
+            img (ndarray): Image with or without drawings.
+            faces (list): One (N, 2) int ndarray of pixel coords per face.
+        """
+        rgb = self._prep(img)
+        if self.landmarker is not None:
+            mpImg = tasks_backend.toImage(rgb)
+            if self.liveStream:
+                self.landmarker.detect_async(mpImg, self._ts.next())
+                latest = self._latest
+                if latest is not None:
+                    result, self.resultTimestampMs = latest
+                else:
+                    result = None
+            else:
+                self.resultTimestampMs = self._ts.next()
+                result = self.landmarker.detect_for_video(
+                    mpImg, self.resultTimestampMs)
+            faceLms = result.face_landmarks if result is not None else []
+            self.results = tasks_backend.legacyResults(
+                multi_face_landmarks=[tasks_backend.toProto(f)
+                                      for f in faceLms] or None)
+        else:
+            self.results = self.faceMesh.process(rgb)
+        faces = []
+        if self.results.multi_face_landmarks:
+            ih, iw = img.shape[:2]
+            for faceLms in self.results.multi_face_landmarks:
+                n = len(faceLms.landmark)
+                pts = np.fromiter((c for lm in faceLms.landmark for c in (lm.x, lm.y)),
+                                  dtype=np.float32, count=2 * n).reshape(n, 2)
+                xy = kernels.scaleToPixels(pts, iw, ih)
+                if draw:
+                    # One polylines call over the cached contour index array
+                    # replaces draw_landmarks' per-connection Python loop.
+                    segments = xy[self._contours].astype(np.int32)
+                    cv2.polylines(img, segments, False, (0, 255, 0), 1, cv2.LINE_AA)
+                faces.append(xy)
+        return img, faces
+
+    def findFaceMesh(self, img, draw=True):
+        """
+        Finds face meshes in the input image.
+
+        List-returning wrapper kept for backward compatibility; prefer
+        findFaceMeshArray where the caller can work with the ndarrays.
+
+        Args:
+            img (ndarray): Input BGR image.
+            draw (bool): Whether to draw mesh on image.
+
+        Returns:
+            img (ndarray): Image with or without drawings.
+            faces (list): List of faces with landmark coordinates.
+        """
+        img, faces = self.findFaceMeshArray(img, draw=draw)
+        return img, [face.tolist() for face in faces]
+
+@functools.lru_cache(maxsize=4)
+def getDefaultDetector(staticMode=False, maxFaces=2, refine_landmarks=False,
+                       minDetectionCon=0.5, minTrackCon=0.5):
+    """
+    Returns a shared FaceMeshDetector for this config, building it only once.
+
+    Opt into this where re-creating detectors would dominate, e.g. in short
+    scripts run per image batch. The cached instance holds one stateful,
+    non-thread-safe FaceMesh graph; concurrent streams need their own
+    FaceMeshDetector each (see pipeline.runMultiStream).
+    """
+    return FaceMeshDetector(staticMode=staticMode, maxFaces=maxFaces,
+                            refine_landmarks=refine_landmarks,
+                            minDetectionCon=minDetectionCon,
+                            minTrackCon=minTrackCon)
+
+
+def main():
+    cap = cv2.VideoCapture(0)
+    detector = FaceMeshDetector(maxFaces=2)
+    fps = pipeline.FpsMeter()
+
+    def infer(img):
+        img, faces = detector.findFaceMesh(img)
+        #if len(faces)!= 0:
+            #print(faces[0])
+        return img
+
+    for img in pipeline.VideoPipeline(cap, infer):
+        cv2.putText(img, fps.tick(), (20, 70), cv2.FONT_HERSHEY_PLAIN, 3, (0, 255, 0), 3)
+        cv2.imshow('Image', img)
+        cv2.waitKey(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,89 +1,96 @@
-import cv2
-import mediapipe as mp
-import time
-
-
-class FaceDetector():
-    """
-    Detects faces in an image using MediaPipe's face detection module.
-
-    Args:
-        minDetectionCon (float): Minimum confidence threshold for detection.
-    """
-    def __init__(self,minDetectionCon=0.5):
-
-        self.minDetectionCon = minDetectionCon
-
-        self.mpFaceDetection = mp.solutions.face_detection
-        self.mpDraw = mp.solutions.drawing_utils
-        self.faceDetection = self.mpFaceDetection.FaceDetection(self.minDetectionCon)
-
-    def findFaces(self, img, draw=True):
-    """
-    Detects faces and optionally draws bounding boxes.
-
-    Args:
-        img (ndarray): Input BGR image.
-        draw (bool): Flag to draw results on the image.
-
-    Returns:
-        img (ndarray): Image with results drawn (if enabled).
-        bboxs (list): List of bounding boxes and confidence scores.
-    """
-        imgRGB = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        self.results = self.faceDetection.process(imgRGB)
-        # print(self.results)
-        bboxs = []
-        if self.results.detections:
-            for id, detection in enumerate(self.results.detections):
-                bboxC = detection.location_data.relative_bounding_box
-                ih, iw, ic = img.shape
-                bbox = int(bboxC.xmin * iw), int(bboxC.ymin * ih), int(bboxC.width * iw), int(bboxC.height * ih)
-                bboxs.append([id, bbox, detection.score])
-                if draw:
-                    img = self.fancyDraw(img,bbox)
-
-                    cv2.putText(img, f'{int(detection.score[0] * 100)}%',
-                            (bbox[0], bbox[1] - 20), cv2.FONT_HERSHEY_PLAIN,
-                            2, (255, 0, 255), 2)
-        return img, bboxs
-
-    def fancyDraw(self, img, bbox, l=30, t=5, rt= 1):
-        x, y, w, h = bbox
-        x1, y1 = x + w, y + h
-
-        cv2.rectangle(img, bbox, (255, 0, 255), rt)
-        # Top Left  x,y
-        cv2.line(img, (x, y), (x + l, y), (255, 0, 255), t)
-        cv2.line(img, (x, y), (x, y+l), (255, 0, 255), t)
-        # Top Right  x1,y
-        cv2.line(img, (x1, y), (x1 - l, y), (255, 0, 255), t)
-        cv2.line(img, (x1, y), (x1, y+l), (255, 0, 255), t)
-        # Bottom Left  x,y1
-        cv2.line(img, (x, y1), (x + l, y1), (255, 0, 255), t)
-        cv2.line(img, (x, y1), (x, y1 - l), (255, 0, 255), t)
-        # Bottom Right  x1,y1
-        cv2.line(img, (x1, y1), (x1 - l, y1), (255, 0, 255), t)
-        cv2.line(img, (x1, y1), (x1, y1 - l), (255, 0, 255), t)
-        return img
-
-
-def main():
-    cap = cv2.VideoCapture(0)
-    pTime = 0
-    detector = FaceDetector()
-    while True:
-        success, img = cap.read()
-        img, bboxs = detector.findFaces(img)
-        print(bboxs)
-
-        cTime = time.time()
-        fps = 1 / (cTime - pTime)
-        pTime = cTime
-        cv2.putText(img, f'FPS: {int(fps)}', (20, 70), cv2.FONT_HERSHEY_PLAIN, 3, (0, 255, 0), 2)
-        cv2.imshow("Image", img)
-        cv2.waitKey(1)
-
-
-if __name__ == "__main__":
-    main()
+import cv2
+import mediapipe as mp
+
+import pipeline
+
+
+class FaceDetector():
+    """
+    Detects faces in an image using MediaPipe's face detection module.
+
+    Args:
+        minDetectionCon (float): Minimum confidence threshold for detection.
+        procWidth (int): Optional width to downscale frames to before
+            inference. The bounding boxes are normalized, so they still map
+            back to the full-resolution frame for free.
+        inputIsRgb (bool): Set when frames already arrive in RGB order
+            (e.g. from pipeline.ffmpegRgbFrames); skips the per-frame
+            channel conversion entirely.
+    """
+    def __init__(self,minDetectionCon=0.5, procWidth=None, inputIsRgb=False):
+
+        self.minDetectionCon = minDetectionCon
+        self.procWidth = procWidth
+        self.inputIsRgb = inputIsRgb
+
+        self.mpFaceDetection = mp.solutions.face_detection
+        self.mpDraw = mp.solutions.drawing_utils
+        self.faceDetection = self.mpFaceDetection.FaceDetection(self.minDetectionCon)
+        self._prep = pipeline.FramePrep(procWidth, inputIsRgb)
+
+    def findFaces(self, img, draw=True):
+        """
+        Detects faces and optionally draws bounding boxes.
+
+        Args:
+            img (ndarray): Input BGR image.
+            draw (bool): Flag to draw results on the image.
+
+        Returns:
+            img (ndarray): Image with results drawn (if enabled).
+            bboxs (list): List of bounding boxes and confidence scores.
+        """
+        rgb = self._prep(img)
+        self.results = self.faceDetection.process(rgb)
+        # print(self.results)
+        bboxs = []
+        if self.results.detections:
+            ih, iw = img.shape[:2]
+            for id, detection in enumerate(self.results.detections):
+                bboxC = detection.location_data.relative_bounding_box
+                bbox = int(bboxC.xmin * iw), int(bboxC.ymin * ih), int(bboxC.width * iw), int(bboxC.height * ih)
+                bboxs.append([id, bbox, detection.score])
+                if draw:
+                    img = self.fancyDraw(img,bbox)
+
+                    cv2.putText(img, f'{int(detection.score[0] * 100)}%',
+                            (bbox[0], bbox[1] - 20), cv2.FONT_HERSHEY_PLAIN,
+                            2, (255, 0, 255), 2)
+        return img, bboxs
+
+    def fancyDraw(self, img, bbox, l=30, t=5, rt= 1):
+        x, y, w, h = bbox
+        x1, y1 = x + w, y + h
+
+        cv2.rectangle(img, bbox, (255, 0, 255), rt)
+        # Top Left  x,y
+        cv2.line(img, (x, y), (x + l, y), (255, 0, 255), t)
+        cv2.line(img, (x, y), (x, y+l), (255, 0, 255), t)
+        # Top Right  x1,y
+        cv2.line(img, (x1, y), (x1 - l, y), (255, 0, 255), t)
+        cv2.line(img, (x1, y), (x1, y+l), (255, 0, 255), t)
+        # Bottom Left  x,y1
+        cv2.line(img, (x, y1), (x + l, y1), (255, 0, 255), t)
+        cv2.line(img, (x, y1), (x, y1 - l), (255, 0, 255), t)
+        # Bottom Right  x1,y1
+        cv2.line(img, (x1, y1), (x1 - l, y1), (255, 0, 255), t)
+        cv2.line(img, (x1, y1), (x1, y1 - l), (255, 0, 255), t)
+        return img
+
+
+def main():
+    cap = cv2.VideoCapture(0)
+    detector = FaceDetector()
+    fps = pipeline.FpsMeter()
+    while True:
+        success, img = cap.read()
+        img, bboxs = detector.findFaces(img)
+        print(bboxs)
+
+        cv2.putText(img, fps.tick(), (20, 70), cv2.FONT_HERSHEY_PLAIN, 3, (0, 255, 0), 2)
+        cv2.imshow("Image", img)
+        cv2.waitKey(1)
+
+
+if __name__ == "__main__":
+    main()
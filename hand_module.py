@@ -1,109 +1,221 @@
-import cv2
-import mediapipe as mp
-import time
-
-class HandDetector():
-    """
-    Detects and tracks hand landmarks using MediaPipe's Hands module.
-
-    Attributes:
-        mode (bool): Static image mode or not.
-        max_hands (int): Maximum number of hands to detect.
-        model_complexity (int): Complexity of the hand landmark model (0 or 1).
-        detection_confidence (float): Minimum confidence value ([0.0, 1.0]) for hand detection.
-        tracking_confidence (float): Minimum confidence value ([0.0, 1.0]) for hand tracking.
-    """
-
-    def __init__(self, mode=False, max_hands=2, model_complexity=1,
-                 detection_confidence=0.5, tracking_confidence=0.5):
-        """
-        Initializes the hand detector with the specified settings.
-
-        Args:
-            mode (bool): Whether to treat input images as a batch of static images.
-            max_hands (int): Maximum number of hands to detect.
-            model_complexity (int): Complexity of the hand landmark model.
-            detection_confidence (float): Minimum confidence threshold for detection.
-            tracking_confidence (float): Minimum confidence threshold for tracking.
-        """
-        self.mode = mode
-        self.max_hands = max_hands
-        self.model_complexity = model_complexity
-        self.detection_confidence = detection_confidence
-        self.tracking_confidence = tracking_confidence
-
-        self.mpHands = mp.solutions.hands
-        self.hands = self.mpHands.Hands(self.mode, self.max_hands,
-                                        self.model_complexity, self.detection_confidence,
-                                        self.tracking_confidence)
-        self.mpDraw = mp.solutions.drawing_utils
-
-    def findHands(self, img, draw=True):
-        """
-        Detects hands and draws landmarks on the given image.
-
-        Args:
-            img (ndarray): Input BGR image.
-            draw (bool): Whether to draw hand landmarks and connections.
-
-        Returns:
-            img (ndarray): Image with or without hand annotations.
-        """
-        imgRGB = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        self.results = self.hands.process(imgRGB)
-
-        if self.results.multi_hand_landmarks:
-            for handLms in self.results.multi_hand_landmarks:
-                if draw:
-                    self.mpDraw.draw_landmarks(img, handLms, self.mpHands.HAND_CONNECTIONS)
-
-        return img
-
-    def findPosition(self, img, handNo=0, draw=True):
-        """
-        Finds the positions of hand landmarks for a specific hand.
-
-        Args:
-            img (ndarray): Input BGR image.
-            handNo (int): Index of the hand to analyze (0 for first hand).
-            draw (bool): Whether to draw circles on each landmark.
-
-        Returns:
-            lmList (list): List of landmark positions in the form [id, x, y].
-        """
-        lmList = []
-
-        if self.results.multi_hand_landmarks:
-            myHand = self.results.multi_hand_landmarks[handNo]
-
-            for id, lm in enumerate(myHand.landmark):
-                h, w, c = img.shape
-                cx, cy = int(lm.x * w), int(lm.y * h)
-                lmList.append([id, cx, cy])
-                if draw:
-                    cv2.circle(img, (cx, cy), 25, (0, 0, 255), cv2.FILLED)
-
-        return lmList
-
-# Dummy test code
-def main():
-    pTime = 0
-    cap = cv2.VideoCapture(0)
-    detector = HandDetector()
-
-    while True:
-        success, img = cap.read()
-        img = detector.findHands(img)
-        lmList = detector.findPosition(img, draw=False)
-
-        cTime = time.time()
-        fps = 1 / (cTime - pTime)
-        pTime = cTime
-
-        cv2.putText(img, str(int(fps)), (10, 70),
-                    cv2.FONT_HERSHEY_PLAIN, 1, (255, 0, 255), 2)
-        cv2.imshow('Video', img)
-        cv2.waitKey(1)
-
-if __name__ == '__main__':
-    main()
+import functools
+
+import cv2
+import mediapipe as mp
+import numpy as np
+
+import kernels
+import pipeline
+import tasks_backend
+
+
+class HandDetector():
+    """
+    Detects and tracks hand landmarks using MediaPipe's Hands module.
+
+    Attributes:
+        mode (bool): Static image mode or not.
+        max_hands (int): Maximum number of hands to detect.
+        model_complexity (int): Complexity of the hand landmark model (0 or 1).
+        detection_confidence (float): Minimum confidence value ([0.0, 1.0]) for hand detection.
+        tracking_confidence (float): Minimum confidence value ([0.0, 1.0]) for hand tracking.
+    """
+
+    def __init__(self, mode=False, max_hands=2, model_complexity=1,
+                 detection_confidence=0.5, tracking_confidence=0.5, modelPath=None,
+                 liveStream=False, procWidth=None, inputIsRgb=False):
+        """
+        Initializes the hand detector with the specified settings.
+
+        Args:
+            mode (bool): Whether to treat input images as a batch of static images.
+            max_hands (int): Maximum number of hands to detect.
+            model_complexity (int): Complexity of the hand landmark model.
+            detection_confidence (float): Minimum confidence threshold for detection.
+            tracking_confidence (float): Minimum confidence threshold for tracking.
+            modelPath (str): Optional path to a hand_landmarker .task asset.
+                When given, inference runs through the Tasks API with the GPU
+                delegate (CPU delegate as fallback) instead of mp.solutions.
+            liveStream (bool): With modelPath, use LIVE_STREAM mode: frames
+                are dispatched asynchronously and findHands annotates with the
+                most recent completed result instead of blocking on inference.
+                resultTimestampMs holds the frame timestamp that result was
+                computed for, so callers can tell how stale it is.
+            procWidth (int): Optional width to downscale frames to before
+                inference. Landmarks are normalized, so coordinates still map
+                back to the full-resolution frame for free.
+            inputIsRgb (bool): Set when frames already arrive in RGB order
+                (e.g. from pipeline.ffmpegRgbFrames); skips the per-frame
+                channel conversion entirely.
+        """
+        self.mode = mode
+        self.max_hands = max_hands
+        self.model_complexity = model_complexity
+        self.detection_confidence = detection_confidence
+        self.tracking_confidence = tracking_confidence
+        self.procWidth = procWidth
+        self.inputIsRgb = inputIsRgb
+
+        self.mpHands = mp.solutions.hands
+        self.landmarker = None
+        self.liveStream = liveStream
+        self._latest = None
+        self._ts = tasks_backend.TimestampGen()
+        self.resultTimestampMs = None
+        if modelPath is not None and tasks_backend.HAS_TASKS:
+            self.landmarker = tasks_backend.createLandmarker(
+                'hand', modelPath, num_hands=self.max_hands,
+                runningMode='live_stream' if liveStream else 'video',
+                resultCallback=self._onResult if liveStream else None)
+        if self.landmarker is None:
+            self.hands = self.mpHands.Hands(self.mode, self.max_hands,
+                                            self.model_complexity,
+                                            self.detection_confidence,
+                                            self.tracking_confidence)
+        self.mpDraw = mp.solutions.drawing_utils
+        self._prep = pipeline.FramePrep(procWidth, inputIsRgb)
+        self._connections = np.array(list(self.mpHands.HAND_CONNECTIONS),
+                                     dtype=np.int32)
+
+    def _drawLandmarks(self, img, lms):
+        """Draws one hand's skeleton with a single batched polylines call."""
+        h, w = img.shape[:2]
+        n = len(lms)
+        pts = np.fromiter((c for lm in lms for c in (lm.x, lm.y)),
+                          dtype=np.float32, count=2 * n).reshape(n, 2)
+        xy = kernels.scaleToPixels(pts, w, h)
+        # polylines wants CV_32S point arrays; the gathered segments are tiny.
+        cv2.polylines(img, xy[self._connections].astype(np.int32), False,
+                      (255, 255, 255), 2)
+        for cx, cy in xy:
+            cv2.circle(img, (cx, cy), 3, (255, 0, 255), cv2.FILLED)
+
+    def _onResult(self, result, output_image, timestamp_ms):
+        """LIVE_STREAM callback: stores the result with its frame timestamp."""
+        self._latest = (result, timestamp_ms)
+
+    def findHands(self, img, draw=True):
+        """
+        Detects hands and draws landmarks on the given image.
+
+        Args:
+            img (ndarray): Input BGR image.
+            draw (bool): Whether to draw hand landmarks and connections.
+
+        Returns:
+            img (ndarray): Image with or without hand annotations.
+        """
+        rgb = self._prep(img)
+        if self.landmarker is not None:
+            mpImg = tasks_backend.toImage(rgb)
+            if self.liveStream:
+                self.landmarker.detect_async(mpImg, self._ts.next())
+                latest = self._latest
+                if latest is not None:
+                    result, self.resultTimestampMs = latest
+                else:
+                    result = None
+            else:
+                self.resultTimestampMs = self._ts.next()
+                result = self.landmarker.detect_for_video(
+                    mpImg, self.resultTimestampMs)
+            handLms = result.hand_landmarks if result is not None else []
+            self.results = tasks_backend.legacyResults(
+                multi_hand_landmarks=[tasks_backend.toProto(h)
+                                      for h in handLms] or None)
+        else:
+            self.results = self.hands.process(rgb)
+
+        if self.results.multi_hand_landmarks:
+            for handLms in self.results.multi_hand_landmarks:
+                if draw:
+                    self._drawLandmarks(img, handLms.landmark)
+
+        return img
+
+    def findPositionArray(self, img, handNo=0, draw=True):
+        """
+        Finds one hand's landmark positions as a single NumPy array.
+
+        Skips the per-landmark list allocations of findPosition and keeps
+        the coordinates contiguous for downstream math.
+
+        Args:
+            img (ndarray): Input BGR image.
+            handNo (int): Index of the hand to analyze (0 for first hand).
+            draw (bool): Whether to draw circles on each landmark.
+
+        Returns:
+            lmArr (ndarray): (N, 3) int32 array of [id, x, y] rows; empty
+                when no hand was detected.
+        """
+        lmArr = np.empty((0, 3), dtype=np.int32)
+
+        if self.results.multi_hand_landmarks:
+            myHand = self.results.multi_hand_landmarks[handNo]
+
+            h, w = img.shape[:2]
+            n = len(myHand.landmark)
+            pts = np.fromiter((c for lm in myHand.landmark for c in (lm.x, lm.y)),
+                              dtype=np.float32, count=2 * n).reshape(n, 2)
+            xy = kernels.scaleToPixels(pts, w, h)
+            lmArr = np.column_stack((np.arange(n, dtype=np.int32), xy))
+            if draw:
+                for cx, cy in xy:
+                    cv2.circle(img, (cx, cy), 25, (0, 0, 255), cv2.FILLED)
+
+        return lmArr
+
+    def findPosition(self, img, handNo=0, draw=True):
+        """
+        Finds the positions of hand landmarks for a specific hand.
+
+        List-returning wrapper kept for backward compatibility; prefer
+        findPositionArray where the caller can work with the ndarray.
+
+        Args:
+            img (ndarray): Input BGR image.
+            handNo (int): Index of the hand to analyze (0 for first hand).
+            draw (bool): Whether to draw circles on each landmark.
+
+        Returns:
+            lmList (list): List of landmark positions in the form [id, x, y].
+        """
+        return self.findPositionArray(img, handNo=handNo, draw=draw).tolist()
+
+@functools.lru_cache(maxsize=4)
+def getDefaultDetector(mode=False, max_hands=2, model_complexity=1,
+                       detection_confidence=0.5, tracking_confidence=0.5):
+    """
+    Returns a shared HandDetector for this config, building it only once.
+
+    An opt-in for scripts that would otherwise pay the graph construction
+    cost repeatedly. The cached detector wraps one stateful, non-thread-safe
+    Hands graph, so it must not be shared across concurrent streams — build
+    a HandDetector per stream for pipeline.runMultiStream.
+    """
+    return HandDetector(mode=mode, max_hands=max_hands,
+                        model_complexity=model_complexity,
+                        detection_confidence=detection_confidence,
+                        tracking_confidence=tracking_confidence)
+
+
+# Dummy test code
+def main():
+    cap = cv2.VideoCapture(0)
+    detector = HandDetector()
+    fps = pipeline.FpsMeter()
+
+    def infer(img):
+        img = detector.findHands(img)
+        detector.findPosition(img, draw=False)
+        return img
+
+    for img in pipeline.VideoPipeline(cap, infer):
+        cv2.putText(img, fps.tick(), (10, 70),
+                    cv2.FONT_HERSHEY_PLAIN, 1, (255, 0, 255), 2)
+        cv2.imshow('Video', img)
+        cv2.waitKey(1)
+
+if __name__ == '__main__':
+    main()
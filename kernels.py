@@ -0,0 +1,88 @@
+import math
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        """No-op stand-in so jitted functions still run as plain Python."""
+        if args and callable(args[0]):
+            return args[0]
+
+        def wrap(func):
+            return func
+        return wrap
+
+    prange = range
+
+
+@njit(cache=True)
+def batchAngles(lm, triplets):
+    """
+    Computes the angle at the middle landmark of each (p1, p2, p3) triplet.
+
+    Takes the whole landmark array and all triplets in one call so the
+    per-angle math runs inside a single jitted loop instead of the
+    interpreter.
+
+    Args:
+        lm (ndarray): (N, 2) pixel coordinates of the landmarks.
+        triplets (ndarray): (M, 3) landmark index triplets.
+
+    Returns:
+        ndarray: (M,) angles in degrees, in [0, 360).
+    """
+    out = np.empty(triplets.shape[0], dtype=np.float64)
+    for i in range(triplets.shape[0]):
+        p1, p2, p3 = triplets[i, 0], triplets[i, 1], triplets[i, 2]
+        v1x = lm[p1, 0] - lm[p2, 0]
+        v1y = lm[p1, 1] - lm[p2, 1]
+        v2x = lm[p3, 0] - lm[p2, 0]
+        v2y = lm[p3, 1] - lm[p2, 1]
+        out[i] = math.degrees(math.atan2(v1x * v2y - v1y * v2x,
+                                         v1x * v2x + v1y * v2y)) % 360.0
+    return out
+
+
+@njit(parallel=True, cache=True)
+def _scaleLandmarks(pts, w, h, out):
+    for i in prange(pts.shape[0]):
+        out[i, 0] = int(pts[i, 0] * w)
+        out[i, 1] = int(pts[i, 1] * h)
+
+
+def scaleToPixels(pts, w, h):
+    """
+    Scales normalized (N,2) landmark coordinates to int pixel positions.
+
+    Dispatches to a parallel jitted kernel when Numba is available — the
+    prange over 468 face mesh landmarks is what justifies parallel=True —
+    and otherwise falls back to the vectorized NumPy expression.
+
+    Pixel coordinates fit comfortably in int16 up to 32k-wide frames, and
+    the narrower type halves the memory traffic of the 468-landmark face
+    mesh flowing through the scale-and-draw path every frame.
+
+    Args:
+        pts (ndarray): (N, 2) normalized float32 coordinates.
+        w, h (int): Frame width and height in pixels.
+
+    Returns:
+        ndarray: (N, 2) int16 pixel coordinates.
+    """
+    if HAS_NUMBA:
+        out = np.empty((pts.shape[0], 2), dtype=np.int16)
+        _scaleLandmarks(pts, np.float32(w), np.float32(h), out)
+        return out
+    return (pts * np.array([w, h], dtype=np.float32)).astype(np.int16)
+
+
+if HAS_NUMBA:
+    # Warm up the JITs at import time so the first frame does not pay for them.
+    batchAngles(np.zeros((3, 2), dtype=np.int32),
+                np.array([[0, 1, 2]], dtype=np.int64))
+    scaleToPixels(np.zeros((1, 2), dtype=np.float32), 1, 1)
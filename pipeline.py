@@ -0,0 +1,274 @@
+import os
+import queue
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+
+def putLatest(q, item):
+    """
+    Puts an item on a bounded queue, dropping the stale entry if full.
+
+    Keeps end-to-end latency bounded: a slow consumer always sees the
+    freshest frame instead of a backlog.
+
+    Args:
+        q (queue.Queue): Bounded queue to put into.
+        item: Frame or result to enqueue.
+    """
+    try:
+        q.put_nowait(item)
+    except queue.Full:
+        try:
+            q.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            q.put_nowait(item)
+        except queue.Full:
+            pass
+
+
+class FramePrep:
+    """
+    Prepares captured frames for inference: optional downscale, then RGB.
+
+    Owns the reusable conversion buffer, so every detector shares one
+    implementation of the preprocessing path instead of a private copy.
+
+    Args:
+        procWidth (int): Optional width to downscale frames to before
+            inference; None keeps the capture resolution.
+        inputIsRgb (bool): Set when frames already arrive in RGB order
+            (e.g. from ffmpegRgbFrames); skips the channel conversion.
+    """
+
+    def __init__(self, procWidth=None, inputIsRgb=False):
+        self.procWidth = procWidth
+        self.inputIsRgb = inputIsRgb
+        self._rgbBuf = None
+
+    def __call__(self, img):
+        """Returns the RGB frame to run inference on for this BGR/RGB input."""
+        proc = img
+        if self.procWidth and img.shape[1] > self.procWidth:
+            h, w = img.shape[:2]
+            proc = cv2.resize(img, (self.procWidth, self.procWidth * h // w))
+        if self.inputIsRgb:
+            return proc
+        if self._rgbBuf is None or self._rgbBuf.shape != proc.shape:
+            self._rgbBuf = np.empty_like(proc)
+        # One streaming copy of the channel-reversed view; cheaper than
+        # cvtColor's per-pixel shuffle and keeps the buffer contiguous.
+        np.copyto(self._rgbBuf, proc[:, :, ::-1])
+        return self._rgbBuf
+
+
+def ffmpegRgbFrames(path, width, height):
+    """
+    Yields raw RGB frames decoded by an ffmpeg subprocess.
+
+    Asking the decoder for -pix_fmt rgb24 delivers frames already in the
+    channel order MediaPipe wants, so the per-frame BGR-to-RGB pass
+    disappears. Pair with a detector constructed with inputIsRgb=True.
+
+    Args:
+        path (str): Video file or stream URL that ffmpeg can open.
+        width (int): Output frame width in pixels.
+        height (int): Output frame height in pixels.
+
+    Yields:
+        frame (ndarray): (height, width, 3) uint8 RGB frame.
+    """
+    cmd = ['ffmpeg', '-i', path, '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+           '-s', f'{width}x{height}', '-loglevel', 'quiet', '-']
+    frameBytes = width * height * 3
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+    try:
+        while True:
+            buf = proc.stdout.read(frameBytes)
+            if len(buf) < frameBytes:
+                break
+            # frombuffer over the read bytes would be read-only and break
+            # in-place drawing downstream; wrapping a bytearray copy keeps
+            # the frame writable without a second ndarray copy.
+            yield np.frombuffer(bytearray(buf),
+                                np.uint8).reshape(height, width, 3)
+    finally:
+        proc.stdout.close()
+        proc.wait()
+
+
+def runMultiStream(sources, makeInfer):
+    """
+    Processes several capture sources concurrently, one detector per stream.
+
+    Detector instances are not safe to share across streams, so makeInfer is
+    called once per source to build an independent inference callable. Every
+    round reads one frame from each source and dispatches them all to a
+    thread pool, so CPU preprocessing and model inference overlap across
+    streams instead of running back to back. The caller can tile the yielded
+    frames (e.g. with np.hstack) into a grid for display.
+
+    Args:
+        sources (list): Opened cv2.VideoCapture (or compatible) objects.
+        makeInfer (callable): Factory returning an infer(img) callable;
+            invoked once per source.
+
+    Yields:
+        results (list): Per-source inference results for one frame round;
+            entries are None for sources that have run out of frames.
+    """
+    infers = [makeInfer() for _ in sources]
+    with ThreadPoolExecutor(max_workers=len(sources)) as pool:
+        while True:
+            frames = [cap.read() for cap in sources]
+            if not any(ok for ok, _ in frames):
+                break
+            futures = [pool.submit(infers[i], img) if ok else None
+                       for i, (ok, img) in enumerate(frames)]
+            yield [f.result() if f is not None else None for f in futures]
+
+
+class FpsMeter:
+    """
+    Tracks frames per second with an exponential moving average.
+
+    Times frames with time.perf_counter_ns and refreshes the rendered label
+    only every `refresh` frames, so the steady-state per-frame cost is one
+    subtraction and two multiplies rather than float formatting.
+
+    Args:
+        smoothing (float): EMA weight given to the previous estimate.
+        refresh (int): Number of frames between label updates.
+    """
+
+    def __init__(self, smoothing=0.9, refresh=10):
+        self.smoothing = smoothing
+        self.refresh = refresh
+        self.label = 'FPS: 0'
+        self._fpsEma = 0.0
+        self._lastNs = None
+        self._frameIdx = 0
+
+    def tick(self):
+        """Registers a frame and returns the cached FPS label."""
+        now = time.perf_counter_ns()
+        if self._lastNs is not None:
+            dt = now - self._lastNs
+            if dt > 0:
+                self._fpsEma = (self.smoothing * self._fpsEma +
+                                (1.0 - self.smoothing) * 1e9 / dt)
+        self._lastNs = now
+        self._frameIdx += 1
+        if self._frameIdx % self.refresh == 0:
+            self.label = f'FPS: {int(self._fpsEma)}'
+        return self.label
+
+
+class VideoPipeline:
+    """
+    Overlaps capture, inference, and display across threads.
+
+    A capture thread reads frames from the source, an inference thread runs
+    the supplied callable on them, and the calling thread iterates over the
+    results (drawing and cv2.imshow must stay on the main thread). Bounded
+    queues between the stages drop stale frames, so throughput approaches
+    the slowest single stage instead of the sum of all stages.
+
+    Args:
+        cap: An opened cv2.VideoCapture (or compatible) source.
+        infer (callable): Called with each captured frame; its return value
+            is what iteration yields.
+        maxsize (int): Bound on each inter-stage queue.
+        coreMap (dict): Optional {'capture': coreId, 'inference': coreId}
+            mapping that pins each worker thread to a CPU core on Linux,
+            avoiding cross-core cache misses on the frame buffer handoff.
+            Ignored where the OS offers no affinity control.
+    """
+
+    def __init__(self, cap, infer, maxsize=2, coreMap=None):
+        self.cap = cap
+        self.infer = infer
+        self.coreMap = coreMap or {}
+        self._frameQ = queue.Queue(maxsize=maxsize)
+        self._resultQ = queue.Queue(maxsize=maxsize)
+        self._stop = threading.Event()
+        self._threads = []
+        self._error = None
+
+    def _pinToCore(self, stage):
+        """Pins the calling thread to its mapped core, if the OS allows it."""
+        core = self.coreMap.get(stage)
+        if core is None or not hasattr(os, 'sched_setaffinity'):
+            return
+        try:
+            # pid 0 applies the mask to the calling thread on Linux, so each
+            # worker stays on its core instead of bouncing between them.
+            os.sched_setaffinity(0, {core})
+        except OSError:
+            pass
+
+    def _captureLoop(self):
+        self._pinToCore('capture')
+        while not self._stop.is_set():
+            success, img = self.cap.read()
+            if not success:
+                self._stop.set()
+                break
+            putLatest(self._frameQ, img)
+
+    def _inferLoop(self):
+        self._pinToCore('inference')
+        try:
+            while True:
+                try:
+                    img = self._frameQ.get(timeout=0.1)
+                except queue.Empty:
+                    if self._stop.is_set():
+                        break
+                    continue
+                putLatest(self._resultQ, self.infer(img))
+        except BaseException as err:
+            # Re-raised in the iterating thread; without this a detector
+            # exception would leave __iter__ waiting forever.
+            self._error = err
+        finally:
+            self._stop.set()
+
+    def start(self):
+        """Starts the capture and inference threads."""
+        for target in (self._captureLoop, self._inferLoop):
+            t = threading.Thread(target=target, daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        """Signals both worker threads to exit and waits for them."""
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout=1.0)
+
+    def __iter__(self):
+        """
+        Yields inference results until the source ends or stop() is called.
+
+        An exception raised by the infer callable stops the pipeline and is
+        re-raised here, on the iterating thread.
+        """
+        self.start()
+        try:
+            while True:
+                try:
+                    yield self._resultQ.get(timeout=0.1)
+                except queue.Empty:
+                    if self._stop.is_set() and not self._threads[-1].is_alive():
+                        break
+        finally:
+            self.stop()
+        if self._error is not None:
+            raise self._error
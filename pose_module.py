@@ -1,147 +1,276 @@
-import cv2
-import mediapipe as mp
-import time
-import math
-
-class poseDetector():
-    """
-    Detects and tracks body pose landmarks using MediaPipe's Pose solution.
-
-    Attributes:
-        mode (bool): Whether to treat input images as a batch of static images.
-        model_complexity (int): Complexity of the pose landmark model (0, 1, or 2).
-        enable_segmentation (bool): Whether to enable segmentation mask generation.
-        smooth_segmentation (bool): Whether to apply smoothing to the segmentation mask.
-        smooth (bool): Whether to smooth the landmark keypoint values over time.
-        detectionCon (float): Minimum detection confidence ([0.0, 1.0]).
-        trackCon (float): Minimum tracking confidence ([0.0, 1.0]).
-    """
-
-    def __init__(self, mode=False, model_complexity=1, enable_segmentation=False,
-                 smooth_segmentation=True, smooth=True, detectionCon=0.5, trackCon=0.5):
-        """
-        Initializes the pose detector with the specified parameters.
-
-        Args:
-            mode (bool): Static image mode or video stream mode.
-            model_complexity (int): Complexity of the pose model.
-            enable_segmentation (bool): Whether to output segmentation masks.
-            smooth_segmentation (bool): Whether to smooth segmentation results.
-            smooth (bool): Whether to smooth landmark detection over time.
-            detectionCon (float): Minimum confidence for initial detection.
-            trackCon (float): Minimum confidence for tracking landmarks.
-        """
-        self.mode = mode
-        self.model_complexity = model_complexity
-        self.enable_segmentation = enable_segmentation
-        self.smooth_segmentation = smooth_segmentation
-        self.smooth = smooth
-        self.detectionCon = detectionCon
-        self.trackCon = trackCon
-
-        self.mpDraw = mp.solutions.drawing_utils
-        self.mpPose = mp.solutions.pose
-        self.pose = self.mpPose.Pose(self.mode, self.model_complexity,
-                                     self.enable_segmentation, self.smooth,
-                                     self.detectionCon, self.trackCon)
-
-    def findPose(self, img, draw=True):
-        """
-        Processes the image to detect body landmarks and optionally draw them.
-
-        Args:
-            img (ndarray): Input BGR image.
-            draw (bool): Whether to draw pose landmarks on the image.
-
-        Returns:
-            img (ndarray): Output image with or without landmarks drawn.
-        """
-        imgRGB = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        self.results = self.pose.process(imgRGB)
-
-        if self.results.pose_landmarks and draw:
-            self.mpDraw.draw_landmarks(img, self.results.pose_landmarks,
-                                       self.mpPose.POSE_CONNECTIONS)
-        return img
-
-    def findPosition(self, img, draw=True):
-        """
-        Extracts the 2D positions of pose landmarks.
-
-        Args:
-            img (ndarray): Image from which pose landmarks are extracted.
-            draw (bool): Whether to draw small circles on landmarks.
-
-        Returns:
-            lmList (list): A list of landmark positions in the format [id, x, y].
-        """
-        self.lmList = []
-        if self.results.pose_landmarks:
-            for id, lm in enumerate(self.results.pose_landmarks.landmark):
-                h, w, c = img.shape
-                cx, cy = int(lm.x * w), int(lm.y * h)
-                self.lmList.append([id, cx, cy])
-                if draw:
-                    cv2.circle(img, (cx, cy), 5, (255, 0, 0), cv2.FILLED)
-        return self.lmList
-
-    def findAngle(self, img, p1, p2, p3, draw=True):
-        """
-        Calculates the angle between three pose landmarks.
-
-        Args:
-            img (ndarray): Image for drawing.
-            p1, p2, p3 (int): Landmark indices.
-            draw (bool): Whether to draw the angle visualization.
-
-        Returns:
-            angle (float): Angle in degrees between the three points.
-        """
-        x1, y1 = self.lmList[p1][1:]
-        x2, y2 = self.lmList[p2][1:]
-        x3, y3 = self.lmList[p3][1:]
-
-        angle = math.degrees(math.atan2(y3 - y2, x3 - x2) -
-                             math.atan2(y1 - y2, x1 - x2))
-        if angle < 0:
-            angle += 360
-
-        if draw:
-            cv2.line(img, (x1, y1), (x2, y2), (255, 255, 255), 3)
-            cv2.line(img, (x3, y3), (x2, y2), (255, 255, 255), 3)
-
-            for point in [(x1, y1), (x2, y2), (x3, y3)]:
-                cv2.circle(img, point, 10, (0, 0, 255), cv2.FILLED)
-                cv2.circle(img, point, 15, (0, 0, 255), 2)
-
-            cv2.putText(img, str(int(angle)), (x2 - 50, y2 + 50),
-                        cv2.FONT_HERSHEY_PLAIN, 2, (0, 0, 255), 2)
-
-        return angle
-
-
-def main():
-    """
-    Test the pose detector with webcam video stream.
-    Draws pose landmarks and prints FPS.
-    """
-    cap = cv2.VideoCapture(0)
-    pTime = 0
-    detector = poseDetector()
-
-    while True:
-        success, img = cap.read()
-        img = detector.findPose(img)
-        lmList = detector.findPosition(img, draw=False)
-
-        cTime = time.time()
-        fps = 1 / (cTime - pTime)
-        pTime = cTime
-
-        cv2.putText(img, str(int(fps)), (70, 50), cv2.FONT_HERSHEY_PLAIN,
-                    3, (255, 0, 0), 3)
-        cv2.imshow("Image", img)
-        cv2.waitKey(1)
-
-if __name__ == "__main__":
-    main()
+import functools
+import math
+
+import cv2
+import mediapipe as mp
+import numpy as np
+
+import kernels
+import pipeline
+import tasks_backend
+
+
+class poseDetector():
+    """
+    Detects and tracks body pose landmarks using MediaPipe's Pose solution.
+
+    Attributes:
+        mode (bool): Whether to treat input images as a batch of static images.
+        model_complexity (int): Complexity of the pose landmark model (0, 1, or 2).
+        enable_segmentation (bool): Whether to enable segmentation mask generation.
+        smooth_segmentation (bool): Whether to apply smoothing to the segmentation mask.
+        smooth (bool): Whether to smooth the landmark keypoint values over time.
+        detectionCon (float): Minimum detection confidence ([0.0, 1.0]).
+        trackCon (float): Minimum tracking confidence ([0.0, 1.0]).
+    """
+
+    def __init__(self, mode=False, model_complexity=1, enable_segmentation=False,
+                 smooth_segmentation=True, smooth=True, detectionCon=0.5, trackCon=0.5,
+                 modelPath=None, liveStream=False, procWidth=None,
+                 inputIsRgb=False):
+        """
+        Initializes the pose detector with the specified parameters.
+
+        Args:
+            mode (bool): Static image mode or video stream mode.
+            model_complexity (int): Complexity of the pose model.
+            enable_segmentation (bool): Whether to output segmentation masks.
+            smooth_segmentation (bool): Whether to smooth segmentation results.
+            smooth (bool): Whether to smooth landmark detection over time.
+            detectionCon (float): Minimum confidence for initial detection.
+            trackCon (float): Minimum confidence for tracking landmarks.
+            modelPath (str): Optional path to a pose_landmarker .task asset.
+                When given, inference runs through the Tasks API with the GPU
+                delegate (CPU delegate as fallback) instead of mp.solutions.
+            liveStream (bool): With modelPath, use LIVE_STREAM mode: frames
+                are dispatched asynchronously and findPose annotates with the
+                most recent completed result instead of blocking on inference.
+                resultTimestampMs holds the frame timestamp that result was
+                computed for, so callers can tell how stale it is.
+            procWidth (int): Optional width to downscale frames to before
+                inference. Landmarks are normalized, so coordinates still map
+                back to the full-resolution frame for free.
+            inputIsRgb (bool): Set when frames already arrive in RGB order
+                (e.g. from pipeline.ffmpegRgbFrames); skips the per-frame
+                channel conversion entirely.
+        """
+        self.mode = mode
+        self.model_complexity = model_complexity
+        self.enable_segmentation = enable_segmentation
+        self.smooth_segmentation = smooth_segmentation
+        self.smooth = smooth
+        self.detectionCon = detectionCon
+        self.trackCon = trackCon
+        self.procWidth = procWidth
+        self.inputIsRgb = inputIsRgb
+
+        self.mpDraw = mp.solutions.drawing_utils
+        self.mpPose = mp.solutions.pose
+        self.landmarker = None
+        self.liveStream = liveStream
+        self._latest = None
+        self._ts = tasks_backend.TimestampGen()
+        self.resultTimestampMs = None
+        if modelPath is not None and tasks_backend.HAS_TASKS:
+            self.landmarker = tasks_backend.createLandmarker(
+                'pose', modelPath,
+                runningMode='live_stream' if liveStream else 'video',
+                resultCallback=self._onResult if liveStream else None)
+        if self.landmarker is None:
+            self.pose = self.mpPose.Pose(self.mode, self.model_complexity,
+                                         self.enable_segmentation, self.smooth,
+                                         self.detectionCon, self.trackCon)
+        self._prep = pipeline.FramePrep(procWidth, inputIsRgb)
+        self._connections = np.array(list(self.mpPose.POSE_CONNECTIONS),
+                                     dtype=np.int32)
+
+    def _onResult(self, result, output_image, timestamp_ms):
+        """LIVE_STREAM callback: stores the result with its frame timestamp."""
+        self._latest = (result, timestamp_ms)
+
+    def _drawLandmarks(self, img, lms):
+        """Draws the pose skeleton with one batched polylines call."""
+        h, w = img.shape[:2]
+        n = len(lms)
+        pts = np.fromiter((c for lm in lms for c in (lm.x, lm.y)),
+                          dtype=np.float32, count=2 * n).reshape(n, 2)
+        xy = kernels.scaleToPixels(pts, w, h)
+        # polylines wants CV_32S point arrays; the gathered segments are tiny.
+        cv2.polylines(img, xy[self._connections].astype(np.int32), False,
+                      (255, 255, 255), 2)
+        for cx, cy in xy:
+            cv2.circle(img, (cx, cy), 2, (255, 0, 0), cv2.FILLED)
+
+    def findPose(self, img, draw=True):
+        """
+        Processes the image to detect body landmarks and optionally draw them.
+
+        Args:
+            img (ndarray): Input BGR image.
+            draw (bool): Whether to draw pose landmarks on the image.
+
+        Returns:
+            img (ndarray): Output image with or without landmarks drawn.
+        """
+        rgb = self._prep(img)
+        if self.landmarker is not None:
+            mpImg = tasks_backend.toImage(rgb)
+            if self.liveStream:
+                self.landmarker.detect_async(mpImg, self._ts.next())
+                latest = self._latest
+                if latest is not None:
+                    result, self.resultTimestampMs = latest
+                else:
+                    result = None
+            else:
+                self.resultTimestampMs = self._ts.next()
+                result = self.landmarker.detect_for_video(
+                    mpImg, self.resultTimestampMs)
+            lms = (result.pose_landmarks[0]
+                   if result is not None and result.pose_landmarks else None)
+            self.results = tasks_backend.legacyResults(
+                pose_landmarks=tasks_backend.toProto(lms))
+        else:
+            self.results = self.pose.process(rgb)
+
+        if self.results.pose_landmarks and draw:
+            self._drawLandmarks(img, self.results.pose_landmarks.landmark)
+        return img
+
+    def findPositionArray(self, img, draw=True):
+        """
+        Extracts the 2D positions of pose landmarks as one NumPy array.
+
+        Skips the per-landmark list allocations of findPosition and keeps
+        the coordinates contiguous for downstream math such as findAngles.
+
+        Args:
+            img (ndarray): Image from which pose landmarks are extracted.
+            draw (bool): Whether to draw small circles on landmarks.
+
+        Returns:
+            lmArr (ndarray): (N, 3) int32 array of [id, x, y] rows; empty
+                when no pose was detected.
+        """
+        self.lmArr = np.empty((0, 3), dtype=np.int32)
+        if self.results.pose_landmarks:
+            h, w = img.shape[:2]
+            lms = self.results.pose_landmarks.landmark
+            n = len(lms)
+            pts = np.fromiter((c for lm in lms for c in (lm.x, lm.y)),
+                              dtype=np.float32, count=2 * n).reshape(n, 2)
+            xy = kernels.scaleToPixels(pts, w, h)
+            self.lmArr = np.column_stack((np.arange(n, dtype=np.int32), xy))
+            if draw:
+                for cx, cy in xy:
+                    cv2.circle(img, (cx, cy), 5, (255, 0, 0), cv2.FILLED)
+        return self.lmArr
+
+    def findPosition(self, img, draw=True):
+        """
+        Extracts the 2D positions of pose landmarks.
+
+        List-returning wrapper kept for backward compatibility; prefer
+        findPositionArray where the caller can work with the ndarray.
+
+        Args:
+            img (ndarray): Image from which pose landmarks are extracted.
+            draw (bool): Whether to draw small circles on landmarks.
+
+        Returns:
+            lmList (list): A list of landmark positions in the format [id, x, y].
+        """
+        self.lmList = self.findPositionArray(img, draw=draw).tolist()
+        return self.lmList
+
+    def findAngles(self, triplets):
+        """
+        Computes several joint angles from the last findPosition call at once.
+
+        Args:
+            triplets (ndarray | list): (M, 3) landmark index triplets; each
+                angle is measured at the middle index.
+
+        Returns:
+            angles (ndarray): (M,) angles in degrees, in [0, 360).
+        """
+        lm = np.ascontiguousarray(self.lmArr[:, 1:])
+        triplets = np.asarray(triplets, dtype=np.int64)
+        return kernels.batchAngles(lm, triplets)
+
+    def findAngle(self, img, p1, p2, p3, draw=True):
+        """
+        Calculates the angle between three pose landmarks.
+
+        Args:
+            img (ndarray): Image for drawing.
+            p1, p2, p3 (int): Landmark indices.
+            draw (bool): Whether to draw the angle visualization.
+
+        Returns:
+            angle (float): Angle in degrees between the three points.
+        """
+        x1, y1 = self.lmArr[p1, 1:3]
+        x2, y2 = self.lmArr[p2, 1:3]
+        x3, y3 = self.lmArr[p3, 1:3]
+
+        # Signed angle between the two vectors from one atan2 of their
+        # cross and dot products; % keeps it in [0, 360) without a branch.
+        v1x, v1y = x1 - x2, y1 - y2
+        v2x, v2y = x3 - x2, y3 - y2
+        angle = math.degrees(math.atan2(v1x * v2y - v1y * v2x,
+                                        v1x * v2x + v1y * v2y)) % 360.0
+
+        if draw:
+            cv2.line(img, (x1, y1), (x2, y2), (255, 255, 255), 3)
+            cv2.line(img, (x3, y3), (x2, y2), (255, 255, 255), 3)
+
+            for point in [(x1, y1), (x2, y2), (x3, y3)]:
+                cv2.circle(img, point, 10, (0, 0, 255), cv2.FILLED)
+                cv2.circle(img, point, 15, (0, 0, 255), 2)
+
+            cv2.putText(img, str(int(angle)), (x2 - 50, y2 + 50),
+                        cv2.FONT_HERSHEY_PLAIN, 2, (0, 0, 255), 2)
+
+        return angle
+
+
+@functools.lru_cache(maxsize=4)
+def getDefaultDetector(mode=False, model_complexity=1, enable_segmentation=False,
+                       smooth=True, detectionCon=0.5, trackCon=0.5):
+    """
+    Returns a shared poseDetector for this config, building it only once.
+
+    Constructing a Pose graph costs hundreds of ms, so scripts that would
+    otherwise re-create detectors can opt into this cache. The underlying
+    graph is stateful and not thread-safe: anything processing several
+    streams concurrently (e.g. pipeline.runMultiStream) must construct its
+    own poseDetector per stream instead of calling this.
+    """
+    return poseDetector(mode=mode, model_complexity=model_complexity,
+                        enable_segmentation=enable_segmentation, smooth=smooth,
+                        detectionCon=detectionCon, trackCon=trackCon)
+
+
+def main():
+    """
+    Test the pose detector with webcam video stream.
+    Draws pose landmarks and prints FPS.
+    """
+    cap = cv2.VideoCapture(0)
+    detector = poseDetector()
+    fps = pipeline.FpsMeter()
+
+    def infer(img):
+        img = detector.findPose(img)
+        detector.findPosition(img, draw=False)
+        return img
+
+    for img in pipeline.VideoPipeline(cap, infer):
+        cv2.putText(img, fps.tick(), (70, 50), cv2.FONT_HERSHEY_PLAIN,
+                    3, (255, 0, 0), 3)
+        cv2.imshow("Image", img)
+        cv2.waitKey(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import time
+from types import SimpleNamespace
+
+import mediapipe as mp
+
+try:
+    from mediapipe.tasks.python import BaseOptions
+    from mediapipe.tasks.python import vision
+    from mediapipe.framework.formats import landmark_pb2
+    HAS_TASKS = True
+except ImportError:
+    HAS_TASKS = False
+
+# Landmarker class / options class names per detector kind.
+_KINDS = {
+    'pose': ('PoseLandmarker', 'PoseLandmarkerOptions'),
+    'hand': ('HandLandmarker', 'HandLandmarkerOptions'),
+    'face': ('FaceLandmarker', 'FaceLandmarkerOptions'),
+}
+
+
+def monotonicMs():
+    """Returns a monotonic timestamp in milliseconds for detect_for_video."""
+    return int(time.monotonic() * 1000)
+
+
+class TimestampGen:
+    """
+    Produces strictly increasing millisecond timestamps for one landmarker.
+
+    detect_for_video and detect_async both raise if a timestamp repeats,
+    and monotonicMs() can return the same value for two frames processed
+    within the same millisecond. Each detector owns one generator so its
+    timestamps advance independently of other streams.
+    """
+
+    def __init__(self):
+        self._last = -1
+
+    def next(self):
+        """Returns the current monotonic ms, bumped past the previous value."""
+        ts = monotonicMs()
+        if ts <= self._last:
+            ts = self._last + 1
+        self._last = ts
+        return ts
+
+
+def toImage(rgb):
+    """Wraps an RGB ndarray as an mp.Image for the Tasks API."""
+    return mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb)
+
+
+def toProto(landmarks):
+    """
+    Converts a Tasks-API landmark list to a NormalizedLandmarkList proto.
+
+    The proto form is what mp.solutions.drawing_utils and the existing
+    find* code expect, so Tasks results can flow through unchanged paths.
+
+    Args:
+        landmarks (list): NormalizedLandmark objects from a Tasks result,
+            or None/empty.
+
+    Returns:
+        NormalizedLandmarkList or None if there were no landmarks.
+    """
+    if not landmarks:
+        return None
+    proto = landmark_pb2.NormalizedLandmarkList()
+    proto.landmark.extend(
+        landmark_pb2.NormalizedLandmark(x=lm.x, y=lm.y, z=lm.z)
+        for lm in landmarks)
+    return proto
+
+
+def legacyResults(**fields):
+    """Wraps Tasks-API output so callers can read it like a Solutions result."""
+    return SimpleNamespace(**fields)
+
+
+def createLandmarker(kind, modelPath, runningMode='video', resultCallback=None,
+                     **options):
+    """
+    Creates a Tasks-API landmarker, preferring the GPU delegate.
+
+    The GPU TFLite delegate runs the landmark backbones on the GPU, which
+    is several times faster than the CPU XNNPACK path where a GL/CUDA
+    device exists. If GPU delegate initialization raises, the same options
+    are retried with the CPU delegate.
+
+    Args:
+        kind (str): One of 'pose', 'hand', or 'face'.
+        modelPath (str): Path to the .task model asset.
+        runningMode (str): 'video' for synchronous detect_for_video, or
+            'live_stream' for asynchronous detect_async with a callback.
+        resultCallback (callable): Required for 'live_stream'; invoked with
+            (result, output_image, timestamp_ms) when inference finishes.
+        **options: Extra keyword arguments for the landmarker options class.
+
+    Returns:
+        The created landmarker instance.
+    """
+    if not HAS_TASKS:
+        raise RuntimeError('mediapipe.tasks is not available in this install')
+    landmarkerName, optionsName = _KINDS[kind]
+    landmarkerCls = getattr(vision, landmarkerName)
+    optionsCls = getattr(vision, optionsName)
+    if runningMode == 'live_stream':
+        mode = vision.RunningMode.LIVE_STREAM
+        options['result_callback'] = resultCallback
+    else:
+        mode = vision.RunningMode.VIDEO
+    lastErr = None
+    for delegate in (BaseOptions.Delegate.GPU, BaseOptions.Delegate.CPU):
+        base = BaseOptions(model_asset_path=modelPath, delegate=delegate)
+        try:
+            return landmarkerCls.create_from_options(
+                optionsCls(base_options=base, running_mode=mode, **options))
+        except Exception as err:
+            lastErr = err
+    raise lastErr